@@ -1,13 +1,26 @@
 import socket
 import tkinter as tk
 from tkinter import ttk, scrolledtext
-from threading import Thread, Event
+from threading import Thread, Event, Condition
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
+import atexit
 import time
 import json
 
+# Log line template: "[timestamp] message"
+_LOG_LINE_FMT = "[%s] %s\n"
+
 class TTSClientGUI:
+    # Pre-encoded JSON tail for each voice preference the GUI can send.
+    # Messages are newline-terminated so the server can frame them.
+    _PAYLOAD_SUFFIX = {
+        voice: f',"voice_gender":"{voice}"}}\n'.encode('utf-8')
+        for voice in ("default", "male", "female")
+    }
+
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("TTS Client")
@@ -15,12 +28,14 @@ class TTSClientGUI:
         
         # Setup logging directory
         self.log_directory = "client_logs"
-        if not os.path.exists(self.log_directory):
-            os.makedirs(self.log_directory)
+        os.makedirs(self.log_directory, exist_ok=True)
         self.log_file = os.path.join(
             self.log_directory, 
             f"client_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         )
+        # Keep the log file open for the lifetime of the client (128 KiB buffer)
+        self._log_fh = open(self.log_file, 'a', encoding='utf-8', buffering=128 * 1024)
+        atexit.register(self._flush_log_file)
         
         # Create the main frame
         self.main_frame = ttk.Frame(self.root, padding="10")
@@ -99,8 +114,19 @@ class TTSClientGUI:
         self.log_path_label = ttk.Label(self.main_frame, text=f"Log file: {os.path.abspath(self.log_file)}")
         self.log_path_label.grid(row=7, column=0, columnspan=3, sticky=tk.W)
         
-        self.log_text = scrolledtext.ScrolledText(self.main_frame, height=6)
-        self.log_text.grid(row=8, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
+        # Read-only log: plain Text + Scrollbar, only enabled while inserting
+        log_frame = ttk.Frame(self.main_frame)
+        log_frame.grid(row=8, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        self.log_text = tk.Text(log_frame, height=6, state='disabled')
+        self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        log_scrollbar = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=self.log_text.yview)
+        log_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.log_text.configure(yscrollcommand=log_scrollbar.set)
+        
+        log_frame.columnconfigure(0, weight=1)
+        log_frame.rowconfigure(0, weight=1)
         
         # Configure grid weights
         self.root.columnconfigure(0, weight=1)
@@ -111,38 +137,143 @@ class TTSClientGUI:
         # Initialize socket and connection state
         self.socket = None
         self.connected = False
+        self.connecting = False
+        self._pending_out = bytearray()  # Unsent bytes when the socket is full
         self.host = '127.0.0.1'
         self.port = 5000
         
+        # Cached compact JSON encoder for outgoing messages
+        self._encode_json = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        
+        # Single reusable worker for blocking network calls (connect)
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tts-io')
+        
         # Event to signal thread termination
         self.shutdown_event = Event()
         
-        # Auto-send thread
-        self.auto_send_thread = None
-        self.auto_send_event = Event()
+        # Auto-send timer (scheduled with root.after)
+        self._auto_after_id = None
+        
+        # Pre-encoded auto-send message: (text, voice_pref, payload bytes) or None
+        self._auto_payload = None
+        self.input_text.bind('<<Modified>>', self._on_input_modified)
+        self.voice_gender.trace_add('write', self._on_voice_changed)
+
+        # Batched logging: entries are queued here and drained by the flusher thread
+        self._log_q = deque()
+        self.max_log_lines = 2000
+        self._see_pending = False
+        self._flush_every = 0.2  # Max seconds between log file flushes while busy
+        self._log_date = (-1, "")  # (tm_yday, "YYYY-MM-DD ") cache for file timestamps
+        self._log_cond = Condition()
+        self._log_stop = Event()
+        self._log_flusher_thread = Thread(target=self._log_flusher, daemon=True, name="LogFlusher")
+        self._log_flusher_thread.start()
 
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)        
 
     def log_message(self, message):
-        now = datetime.now()
-        screen_time = now.strftime("%H:%M:%S.%f")[:-3]  # Add milliseconds
-        file_timestamp = now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]  # Add milliseconds
-        
-        # Add to GUI log with time and milliseconds
-        screen_entry = f"[{screen_time}] {message}\n"
-        self.log_text.insert(tk.END, screen_entry)
+        t = time.time()
+        lt = time.localtime(t)
+        ms = int((t - int(t)) * 1000)
+        screen_time = f"{lt.tm_hour:02d}:{lt.tm_min:02d}:{lt.tm_sec:02d}.{ms:03d}"  # Add milliseconds
+        
+        # Date prefix only changes once a day - reformat lazily
+        day, date_prefix = self._log_date
+        if day != lt.tm_yday:
+            date_prefix = time.strftime("%Y-%m-%d ", lt)
+            self._log_date = (lt.tm_yday, date_prefix)
+        file_timestamp = date_prefix + screen_time
+        
+        screen_entry = _LOG_LINE_FMT % (screen_time, message)
+        file_entry = _LOG_LINE_FMT % (file_timestamp, message)
+        
+        # Hand off to the flusher thread (GUI + file are written in batches)
+        with self._log_cond:
+            self._log_q.append((screen_time, screen_entry, file_entry))
+            self._log_cond.notify()
+
+    def _log_flusher(self):
+        """Drain queued log entries in batches: one GUI insert and one file write per batch.
+        
+        The file is never fsync'd; buffered data is flushed at most every
+        `_flush_every` seconds while busy, and as soon as logging goes idle.
+        """
+        unflushed = False
+        last_flush = time.monotonic()
+        
+        while True:
+            with self._log_cond:
+                while not self._log_q and not self._log_stop.is_set():
+                    if not self._log_cond.wait(timeout=0.2) and unflushed:
+                        break  # Idle - flush what we have
+                batch = list(self._log_q)
+                self._log_q.clear()
+            
+            if not batch:
+                if unflushed:
+                    self._flush_log_file()
+                    unflushed = False
+                    last_flush = time.monotonic()
+                if self._log_stop.is_set():
+                    break  # Stop requested and nothing left to write
+                continue
+            
+            if not self._log_stop.is_set():
+                try:
+                    self.root.after(0, self._append_screen_entries, [e[1] for e in batch])
+                except:
+                    pass
+            
+            # Write to log file with full timestamp and milliseconds
+            try:
+                self._log_fh.writelines([e[2] for e in batch])
+                unflushed = True
+                if time.monotonic() - last_flush >= self._flush_every:
+                    self._flush_log_file()
+                    unflushed = False
+                    last_flush = time.monotonic()
+            except Exception as e:
+                error_time = batch[-1][0]  # Reuse the failing entry's timestamp
+                try:
+                    self.root.after(0, self._append_screen_entries,
+                                    [_LOG_LINE_FMT % (error_time, f"Error writing to log file: {e}")])
+                except:
+                    pass
+                self._flush_log_file()
+
+    def _append_screen_entries(self, entries):
+        """Add a batch of entries to the GUI log (runs on the Tk thread)"""
+        self.log_text.configure(state='normal')
+        self.log_text.insert(tk.END, "".join(entries))
+        
+        # Keep only the newest lines so the widget stays small in long sessions
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > self.max_log_lines:
+            self.log_text.delete('1.0', f'{line_count - self.max_log_lines}.0')
+        self.log_text.configure(state='disabled')
+        
+        self._schedule_see()
+
+    def _schedule_see(self):
+        """Scroll the GUI log to the end at most once per 50 ms"""
+        if self._see_pending:
+            return
+        self._see_pending = True
+        self.root.after(50, self._do_see)
+
+    def _do_see(self):
+        self._see_pending = False
         self.log_text.see(tk.END)
-        
-        # Write to log file with full timestamp and milliseconds
+
+    def _flush_log_file(self):
+        """Flush buffered log entries to disk"""
         try:
-            file_entry = f"[{file_timestamp}] {message}\n"
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(file_entry)
-        except Exception as e:
-            error_time = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            self.log_text.insert(tk.END, f"[{error_time}] Error writing to log file: {e}\n")
-            self.log_text.see(tk.END)
+            if not self._log_fh.closed:
+                self._log_fh.flush()
+        except:
+            pass
 
     def clear_text(self):
         """Clear the input text field"""
@@ -150,19 +281,44 @@ class TTSClientGUI:
         self.log_message("Input field cleared")
 
     def connect(self):
+        """Open the server connection (runs on the I/O worker, no Tk access)"""
+        sock = None
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.host, self.port))
-            self.connected = True
-            self.status_var.set(f"Connected to {self.host}:{self.port}")
-            self.connect_button.config(text="Disconnect")
-            self.log_message(f"Connected to server at {self.host}:{self.port}")
-            self.send_button.config(state=tk.NORMAL)
-            self.clear_button.config(state=tk.NORMAL)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.connect((self.host, self.port))
+            # Disable Nagle - messages are small and latency matters
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            error = None
         except Exception as e:
-            self.log_message(f"Connection error: {e}")
+            if sock:
+                sock.close()
+            sock = None
+            error = e
+        
+        try:
+            self.root.after(0, self._on_connect_done, sock, error)
+        except:
+            if sock:
+                sock.close()
+
+    def _on_connect_done(self, sock, error):
+        """Apply the connect result to the GUI (runs on the Tk thread)"""
+        self.connecting = False
+        if error is not None:
+            self.log_message(f"Connection error: {error}")
             self.status_var.set("Connection failed")
             self.connected = False
+            return
+        
+        sock.setblocking(False)  # Sends must never stall the GUI
+        self.socket = sock
+        self._pending_out = bytearray()
+        self.connected = True
+        self.status_var.set(f"Connected to {self.host}:{self.port}")
+        self.connect_button.config(text="Disconnect")
+        self.log_message(f"Connected to server at {self.host}:{self.port}")
+        self.send_button.config(state=tk.NORMAL)
+        self.clear_button.config(state=tk.NORMAL)
 
     def disconnect(self):
         # Stop auto-send if running
@@ -172,6 +328,7 @@ class TTSClientGUI:
         if self.socket:
             self.socket.close()
             self.socket = None
+        self._pending_out = bytearray()
         self.connected = False
         self.status_var.set("Not Connected")
         self.connect_button.config(text="Connect")
@@ -181,7 +338,10 @@ class TTSClientGUI:
 
     def toggle_connection(self):
         if not self.connected:
-            Thread(target=self.connect).start()
+            if self.connecting:
+                return
+            self.connecting = True
+            self._io_pool.submit(self.connect)
         else:
             self.disconnect()
 
@@ -198,16 +358,10 @@ class TTSClientGUI:
         # Get voice preference
         voice_pref = self.voice_gender.get()
         
-        # Create message with voice preference
-        message_data = {
-            "text": text,
-            "voice_gender": voice_pref
-        }
-        
         try:
-            # Send as JSON
-            json_message = json.dumps(message_data)
-            self.socket.send(json_message.encode('utf-8'))
+            # Send as JSON with voice preference
+            buf = self._build_payload(text, voice_pref)
+            self._send_payload(buf)
             
             if voice_pref == "default":
                 self.log_message(f"Sent: {text} (server default voice)")
@@ -217,6 +371,47 @@ class TTSClientGUI:
             self.log_message(f"Error sending text: {e}")
             self.disconnect()
 
+    def _build_payload(self, text, voice_pref):
+        """Encode a message with voice preference as compact UTF-8 JSON"""
+        return b'{"text":' + self._encode_json(text).encode('utf-8') + self._PAYLOAD_SUFFIX[voice_pref]
+
+    def _send_payload(self, payload):
+        """Send one complete, pre-encoded message without blocking the GUI.
+        
+        Whatever the socket can't take right now is kept in _pending_out and
+        drained from the Tk event loop.
+        """
+        if self._pending_out:
+            self._pending_out += payload  # Preserve message order
+            return
+        
+        try:
+            sent = self.socket.send(payload)
+        except BlockingIOError:
+            sent = 0
+        
+        if sent < len(payload):
+            self._pending_out = bytearray(payload[sent:])
+            self.root.after(10, self._drain_out)
+
+    def _drain_out(self):
+        """Retry sending buffered output (runs on the Tk thread)"""
+        if not self._pending_out or not self.socket:
+            return
+        
+        try:
+            sent = self.socket.send(self._pending_out)
+            del self._pending_out[:sent]
+        except BlockingIOError:
+            pass
+        except Exception as e:
+            self.log_message(f"Error sending text: {e}")
+            self.disconnect()
+            return
+        
+        if self._pending_out:
+            self.root.after(10, self._drain_out)
+
     def toggle_auto_send(self):
         """Toggle auto-send on/off"""
         if not self.auto_send_active:
@@ -235,8 +430,8 @@ class TTSClientGUI:
             self.log_message("Cannot start auto-send: No text in input field")
             return
         
+        self._refresh_auto_payload()
         self.auto_send_active = True
-        self.auto_send_event.clear()
         
         # Update UI
         self.auto_send_button.config(text="Stop Auto")
@@ -245,11 +440,32 @@ class TTSClientGUI:
         self.send_button.config(state=tk.DISABLED)
         
         interval = self.auto_interval.get()
+        self._auto_interval_s = interval
         self.log_message(f"Auto-send started (every {interval} seconds)")
         
-        # Start auto-send thread
-        self.auto_send_thread = Thread(target=self.auto_send_worker, daemon=True)
-        self.auto_send_thread.start()
+        # First send goes out immediately, then every interval
+        self._auto_after_id = self.root.after(0, self._auto_tick)
+
+    def _refresh_auto_payload(self):
+        """Re-encode the auto-send payload from the current input text and voice"""
+        text = self.input_text.get("1.0", tk.END).strip()
+        if not text:
+            self._auto_payload = None
+            return
+        
+        voice_pref = self.voice_gender.get()
+        self._auto_payload = (text, voice_pref, self._build_payload(text, voice_pref))
+
+    def _on_input_modified(self, event=None):
+        """Keep the auto-send payload in sync with edits to the input field"""
+        self.input_text.edit_modified(False)
+        if self.auto_send_active:
+            self._refresh_auto_payload()
+
+    def _on_voice_changed(self, *args):
+        """Re-encode the auto-send payload when the voice preference changes"""
+        if self.auto_send_active:
+            self._refresh_auto_payload()
 
     def stop_auto_send(self):
         """Stop automatic periodic sending"""
@@ -257,7 +473,9 @@ class TTSClientGUI:
             return
         
         self.auto_send_active = False
-        self.auto_send_event.set()
+        if self._auto_after_id is not None:
+            self.root.after_cancel(self._auto_after_id)
+            self._auto_after_id = None
         
         # Update UI
         self.auto_send_button.config(text="Start Auto")
@@ -268,51 +486,42 @@ class TTSClientGUI:
         
         self.log_message("Auto-send stopped")
 
-    def auto_send_worker(self):
-        """Worker thread for auto-sending"""
-        interval = self.auto_interval.get()
+    def _auto_tick(self):
+        """Send the auto-send payload and reschedule (runs on the Tk thread)"""
+        self._auto_after_id = None
+        if not self.auto_send_active or self.shutdown_event.is_set():
+            return
         
-        while self.auto_send_active and not self.shutdown_event.is_set():
-            # Check if still connected
-            if not self.connected:
-                self.log_message("Auto-send stopped: Connection lost")
-                self.root.after(0, self.stop_auto_send)
-                break
-            
-            # Get text from input field
-            text = self.input_text.get("1.0", tk.END).strip()
-            
-            if not text:
-                self.log_message("Auto-send stopped: Input field is empty")
-                self.root.after(0, self.stop_auto_send)
-                break
-            
-            # Get voice preference
-            voice_pref = self.voice_gender.get()
-            
-            # Create message with voice preference
-            message_data = {
-                "text": text,
-                "voice_gender": voice_pref
-            }
-            
-            # Send the message
-            try:
-                json_message = json.dumps(message_data)
-                self.socket.send(json_message.encode('utf-8'))
-                
-                if voice_pref == "default":
-                    self.log_message(f"Auto-sent: {text} (server default)")
-                else:
-                    self.log_message(f"Auto-sent: {text} ({voice_pref})")
-            except Exception as e:
-                self.log_message(f"Auto-send error: {e}")
-                self.root.after(0, self.disconnect)
-                break
+        # Check if still connected
+        if not self.connected:
+            self.log_message("Auto-send stopped: Connection lost")
+            self.stop_auto_send()
+            return
+        
+        auto_payload = self._auto_payload
+        
+        if auto_payload is None:
+            self.log_message("Auto-send stopped: Input field is empty")
+            self.stop_auto_send()
+            return
+        
+        text, voice_pref, buf = auto_payload
+        
+        # Send the message
+        try:
+            self._send_payload(buf)
             
-            # Wait for the interval (or until stop signal)
-            if self.auto_send_event.wait(timeout=interval):
-                break  # Stop signal received
+            if voice_pref == "default":
+                self.log_message(f"Auto-sent: {text} (server default)")
+            else:
+                self.log_message(f"Auto-sent: {text} ({voice_pref})")
+        except Exception as e:
+            self.log_message(f"Auto-send error: {e}")
+            self.disconnect()
+            return
+        
+        # Schedule the next send
+        self._auto_after_id = self.root.after(self._auto_interval_s * 1000, self._auto_tick)
 
     def on_close(self):
         """Handle application shutdown."""
@@ -324,6 +533,20 @@ class TTSClientGUI:
         
         # Disconnect
         self.disconnect()
+        self._io_pool.shutdown(wait=False)
+        
+        # Stop the flusher (it drains remaining entries to the file first)
+        with self._log_cond:
+            self._log_stop.set()
+            self._log_cond.notify()
+        self._log_flusher_thread.join(timeout=1)
+        
+        # Flush and close log file
+        self._flush_log_file()
+        try:
+            self._log_fh.close()
+        except:
+            pass
         
         # Close GUI
         self.root.destroy()
@@ -1,14 +1,14 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import socket
-import win32com.client
+import selectors
+import functools
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-from datetime import datetime
 import os
 import threading
-from threading import Event, Lock, Condition
+from threading import Event, Lock, Semaphore, BoundedSemaphore
 from typing import Any, Optional
-import select
+from collections import deque
 import ipaddress
 import string
 import errno
@@ -16,8 +16,14 @@ import time
 import traceback
 import json
 import queue
+import re
 import sys
 
+try:
+    import orjson  # Optional - falls back to the json module
+except ImportError:
+    orjson = None
+
 
 
 """
@@ -29,6 +35,9 @@ INSTALLATION:
     
     Required dependencies:
         py -m pip install pywin32
+    
+    Optional (faster JSON parsing of requests):
+        py -m pip install orjson
 
 Features:
 1. Async TTS mode (eliminates post-speech silence)
@@ -44,80 +53,269 @@ Features:
 11. Log window shows last 60 messages (~1 minute)
 """
 
+# Characters allowed in spoken text: printable ASCII except vertical tab / form feed.
+# clean_text() drops everything else with a single str.translate pass.
+_ALLOWED_CHARS = set(string.printable) - set("\x0b\x0c")
+_CLEAN_TEXT_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if chr(c) not in _ALLOWED_CHARS))
+# Same filter at the bytes level for raw TCP input: every byte outside the allowed
+# set (including all non-ASCII bytes) is deleted before decoding.
+_CLEAN_BYTES_DELETE = bytes(b for b in range(256) if chr(b) not in _ALLOWED_CHARS)
+
+# Lines kept in the log window
+_LOG_DISPLAY_LINES = 60
+
+# TCP framing: unterminated bytes a client may leave buffered before it is dropped, and how
+# long a client that never sent a newline must be quiet before its bytes count as one
+# legacy (one message per write) message
+_TCP_MAX_BUFFER = 1024 * 1024
+_TCP_LEGACY_IDLE = 0.1
+
+# Open TCP connections served at once; kept well below the 512 sockets the select()-based
+# selector handles on Windows (the listeners and the wakeup socket need a few more)
+_TCP_MAX_CLIENTS = 256
+
+# Keyword patterns for classifying voice and audio device names (matched against lowercase names)
+_MALE_VOICE_RE = re.compile("david|mark|james|paul|male|man")
+_FEMALE_VOICE_RE = re.compile("zira|hazel|susan|female|woman|huihui|hanhan")
+_MONITOR_DEVICE_RE = re.compile("monitor|display|dell|lg|samsung|hdmi|asus|acer|hp")
+_COMPUTER_SPEAKER_RE = re.compile("speakers|internal|built-in|conexant|idt|laptop")
+_HIGH_LATENCY_DEVICE_RE = re.compile("bluetooth|usb|wireless|headphone|headset")
+
+# JSON parser for HTTP bodies and TCP messages (bytes in, no separate decode step)
+_json_loads = orjson.loads if orjson else json.loads
+
+
+def _create_sapi_voice():
+    """Create an SAPI.SpVoice, early-bound through the gencache wrapper when possible"""
+    import win32com.client  # pywin32 is heavy; load it on first use (detection thread)
+    try:
+        return win32com.client.gencache.EnsureDispatch("SAPI.SpVoice")
+    except Exception:
+        # Generated wrapper unavailable (e.g. read-only cache) - use late binding
+        return win32com.client.Dispatch("SAPI.SpVoice")
+
+
+def _resolve_pid_exists():
+    """Pick the pid_exists(pid) implementation: psutil, else kernel32.OpenProcess"""
+    try:
+        # Try psutil first (more reliable)
+        import psutil
+        return psutil.pid_exists
+    except ImportError:
+        pass
+    
+    # psutil not available, use Windows-specific check
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.OpenProcess.restype = ctypes.c_void_p
+        kernel32.OpenProcess.argtypes = [ctypes.c_uint32, ctypes.c_int, ctypes.c_uint32]
+    except Exception:
+        # Fallback: assume process is running if we can't check
+        return lambda pid: True
+    
+    PROCESS_QUERY_INFORMATION = 0x0400
+    
+    def pid_exists(pid):
+        handle = kernel32.OpenProcess(PROCESS_QUERY_INFORMATION, False, pid)
+        if handle:
+            kernel32.CloseHandle(handle)
+            return True
+        return False
+    
+    return pid_exists
+
+
+_pid_exists = None  # Set by is_process_running() on first use
+
+
+# (second, "HH:MM:SS", "YYYY-MM-DD HH:MM:SS") - formatted at most once per second
+_ts_cache = (None, "", "")
+
+
+def _format_second(sec: int) -> tuple:
+    """Return ("HH:MM:SS", "YYYY-MM-DD HH:MM:SS") for epoch second sec (cached)"""
+    global _ts_cache
+    cached_sec, screen_prefix, file_prefix = _ts_cache
+    if sec != cached_sec:
+        lt = time.localtime(sec)
+        screen_prefix = time.strftime("%H:%M:%S", lt)
+        file_prefix = time.strftime("%Y-%m-%d ", lt) + screen_prefix
+        _ts_cache = (sec, screen_prefix, file_prefix)
+    return screen_prefix, file_prefix
+
+
+def _format_log_timestamps(t: float) -> tuple:
+    """Return (screen_time, file_timestamp) with milliseconds for epoch time t"""
+    sec = int(t)
+    screen_prefix, file_prefix = _format_second(sec)
+    ms = f".{int((t - sec) * 1000):03d}"
+    return screen_prefix + ms, file_prefix + ms
+
+
 class OptimizedQueue:
-    """Ultra-low latency queue with condition variable and size limit"""
+    """Ultra-low latency queue with semaphore flow control and size limit"""
+    __slots__ = ('_queue', '_free', '_items')  # Fixed layout: faster attribute access on the hot path
+    
     def __init__(self, maxsize=100):
-        self._queue = []
-        self._lock = Lock()
-        self._condition = Condition(self._lock)
-        self._maxsize = maxsize
+        self._queue = deque()  # append/popleft are atomic, so no mutex around the deque
+        self._free = BoundedSemaphore(maxsize) if maxsize > 0 else None  # Free slots
+        self._items = Semaphore(0)  # Queued items (plus interrupt() wake-ups)
         
     def put(self, item: Any) -> bool:
         """Add item and wake waiting thread instantly. Returns False if queue is full."""
-        with self._condition:
-            if self._maxsize > 0 and len(self._queue) >= self._maxsize:
-                return False  # Queue full, reject message
-            self._queue.append(item)
-            self._condition.notify()
-            return True
+        if self._free is not None and not self._free.acquire(blocking=False):
+            return False  # Queue full, reject message
+        self._queue.append(item)
+        self._items.release()
+        return True
             
     def get_wait(self, timeout: Optional[float] = None) -> Optional[Any]:
-        """Block until item available - instant wake when item added"""
-        with self._condition:
-            while len(self._queue) == 0:
-                if not self._condition.wait(timeout):
-                    return None
-            return self._queue.pop(0)
+        """Block until item available - instant wake when item added.
+        Returns None on timeout or when woken by interrupt()."""
+        if not self._items.acquire(timeout=timeout):
+            return None
+        try:
+            item = self._queue.popleft()
+        except IndexError:
+            return None  # Permit came from interrupt(), not put()
+        if self._free is not None:
+            self._free.release()
+        return item
+    
+    def get_batch(self, max_items: int, timeout: Optional[float] = None) -> list:
+        """Block for the first item like get_wait(), then take up to max_items - 1
+        more that are already queued. Returns [] on timeout or interrupt()."""
+        item = self.get_wait(timeout)
+        if item is None:
+            return []
+        batch = [item]
+        while len(batch) < max_items and self._items.acquire(blocking=False):
+            try:
+                batch.append(self._queue.popleft())
+            except IndexError:
+                break  # Permit came from interrupt(), not put()
+            if self._free is not None:
+                self._free.release()
+        return batch
+    
+    def interrupt(self):
+        """Wake a blocked get_wait() without an item (used for restart/shutdown)"""
+        self._items.release()
     
     def qsize(self) -> int:
-        """Get queue size"""
-        with self._lock:
-            return len(self._queue)
+        """Get queue size (lock-free snapshot - len() is atomic, value is advisory)"""
+        return len(self._queue)
+
+
+class TCPClient:
+    """Receive state of one TCP connection served by the listener selector"""
+    __slots__ = ('sock', 'ip', 'data', 'framed', 'received_at', 'last_recv')
+    
+    def __init__(self, sock: socket.socket, ip: str):
+        self.sock = sock
+        self.ip = ip
+        self.data = bytearray()  # Reused receive buffer
+        self.framed = False  # Set once the client sends newline-delimited messages
+        self.received_at = 0.0  # time.time() when the buffered partial message started
+        self.last_recv = 0.0  # time.monotonic() of the last recv, for the legacy idle check
 
 
 class TTSRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive: clients can reuse one connection
+    disable_nagle_algorithm = True  # Send small responses immediately
+    timeout = 5  # Socket timeout so a slow client can't hold a worker forever
+    max_body_size = 1024 * 1024  # Refuse request bodies larger than 1 MiB
+    
+    def _respond(self, code: int, body: bytes = b""):
+        """Send a complete response (Content-Length is required for keep-alive)"""
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+    
     def do_POST(self):
         if self.path == '/tts':
             # TIMESTAMP when HTTP request arrives
-            receive_timestamp = datetime.now()
+            receive_timestamp = time.time()
             
-            content_length = int(self.headers['Content-Length'])
-            message = self.rfile.read(content_length).decode('utf-8')
-            
-            # Try to parse as JSON
+            # Single header lookup; a missing header means an empty body
+            content_length = self.headers.get('Content-Length')
             try:
-                message_data = json.loads(message)
-                text = message_data.get("text", "")
+                content_length = int(content_length) if content_length else 0
+            except ValueError:
+                content_length = -1
+            if content_length < 0:
+                self.close_connection = True  # Body length unknown, can't find the next request
+                self._respond(400, b"Bad Content-Length")
+                return
+            if content_length > self.max_body_size:
+                self.close_connection = True  # Body is left unread
+                self._respond(413, b"Message too large")  # Payload Too Large
+                return
+            
+            # Read the body straight into a preallocated buffer
+            buf = bytearray(content_length)
+            view = memoryview(buf)
+            got = 0
+            while got < content_length:
+                n = self.rfile.readinto(view[got:])
+                if not n:
+                    break
+                got += n
+            view.release()
+            if got < content_length:
+                del buf[got:]
+            
+            # Only bodies that look like a JSON object are parsed as JSON
+            is_json = False
+            voice_gender = "default"
+            if buf.lstrip()[:1] == b"{":
+                try:
+                    message_data = _json_loads(buf)
+                    is_json = True
+                except ValueError:
+                    pass
+            
+            if is_json:
+                # A text that is not a string (null, number, list) counts as empty
+                text = message_data.get("text")
+                if not isinstance(text, str):
+                    text = ""
                 voice_gender = message_data.get("voice_gender", "default")
-            except (json.JSONDecodeError, TypeError):
+                if not isinstance(voice_gender, str):
+                    voice_gender = "default"  # Must stay hashable for the voice lookup
+            else:
                 # Not JSON, treat as plain text
-                text = message
-                voice_gender = "default"
+                text = str(buf, 'utf-8', 'ignore')
             
             cleaned_message = self.server.gui.clean_text(text)
             
             if cleaned_message:
                 if not self.server.message_queue.put((cleaned_message, "HTTP", voice_gender, receive_timestamp)):
-                    self.send_response(503)  # Service Unavailable
-                    self.end_headers()
-                    self.wfile.write(b"Queue full")
+                    self._respond(503, b"Queue full")  # Service Unavailable
                     return
                 
-                self.send_response(200)
-                self.end_headers()
-                self.wfile.write(b"OK")
+                self._respond(200, b"OK")
             else:
-                self.send_response(400)
-                self.end_headers()
-                self.wfile.write(b"Empty message")
+                self._respond(400, b"Empty message")
         else:
-            self.send_response(404)
-            self.end_headers()
+            self.close_connection = True  # Any body is left unread
+            self._respond(404)
 
     def log_message(self, format, *args):
         pass
 
 
+class TTSHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server that also sets SO_REUSEPORT where the OS supports it"""
+    def server_bind(self):
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
 class TTSServerGUI:
     def __init__(self):
         try:
@@ -150,24 +348,27 @@ class TTSServerGUI:
             self.message_queue = OptimizedQueue()
             self.shutdown_event = Event()
             self.restart_tts_event = Event()
+            self.tts_ready_event = Event()  # Set once the processor thread owns a live engine
             
-            # Log buffer for event-driven display
-            self.log_buffer = []
-            self.log_buffer_lock = Lock()
+            # Log ring for event-driven display; producers append without locking
+            # (deque append/popleft are atomic) and the GUI thread drains it
+            self.log_buffer = deque(maxlen=10000)
+            self._log_display_scheduled = False
             
-            # Log file writer queue
-            self.log_file_queue = queue.Queue()
+            # Log file writer queue (batches of entries); bounded so a stalled
+            # disk drops log batches instead of growing memory or blocking the GUI
+            self.log_file_queue = queue.Queue(maxsize=1000)
             
             # File logging enabled flag (disabled by default)
             self.enable_file_logging = tk.BooleanVar(value=False)
+            self._file_logging = False  # Plain-bool mirror, safe to read from any thread
             
             # Setup logging
             self.log_directory = "server_logs"
-            if not os.path.exists(self.log_directory):
-                os.makedirs(self.log_directory)
+            os.makedirs(self.log_directory, exist_ok=True)
             
             # Use date-based file names (one per day)
-            today = datetime.now().strftime('%Y%m%d')
+            today = time.strftime('%Y%m%d')
             self.system_log_file = os.path.join(
                 self.log_directory, 
                 f"server_system_log_{today}.txt"
@@ -185,18 +386,26 @@ class TTSServerGUI:
             self.tcp_port = 5000
             self.http_port = 5001
             
-            # Allowed IP ranges
-            self.allowed_networks = [
-                ipaddress.ip_network('127.0.0.0/8'),
-                ipaddress.ip_network('192.168.0.0/16'),
-                ipaddress.ip_network('10.0.0.0/8'),
-                ipaddress.ip_network('172.16.0.0/12')
-            ]
+            # Allowed IP ranges, as (network, netmask) 32-bit ints for the per-connection check
+            self.allowed_networks = tuple(
+                (int(n.network_address), int(n.netmask))
+                for n in (
+                    ipaddress.ip_network('127.0.0.0/8'),
+                    ipaddress.ip_network('192.168.0.0/16'),
+                    ipaddress.ip_network('10.0.0.0/8'),
+                    ipaddress.ip_network('172.16.0.0/12')
+                )
+            )
+            self._ip_allow_cache = {}  # ip string -> allowed, for repeat clients
+            
+            # Error reporting - call site tag -> monotonic time of its last traceback
+            self._last_traceback_at = {}
             
             # Statistics
             self.message_counter = 0
             self.processed_counter = 0
             self.stats_lock = Lock()
+            self._shown_stats = None  # (queue size, processed) currently on the labels
             
             # Audio device info
             self.audio_devices = []
@@ -208,6 +417,7 @@ class TTSServerGUI:
             self.male_voices = []  # Indices of male voices
             self.female_voices = []  # Indices of female voices
             self.selected_voice_index = tk.IntVar(value=0)
+            self._default_voice_index = 0  # Chosen by detect_voices, applied on the GUI thread
             
             # Volume control
             self.volume = tk.IntVar(value=100)
@@ -215,17 +425,29 @@ class TTSServerGUI:
             # Speed/Rate control (Range: 0 to 3)
             self.speech_rate = tk.IntVar(value=0)
             
-            # Detect audio devices and voices
-            self.detect_audio_devices()
-            self.detect_voices()
+            # Plain-int copies of the settings above for the TTS thread (no Tcl calls there)
+            self._mirror_var(self.selected_audio_index, '_audio_index')
+            self._mirror_var(self.selected_voice_index, '_voice_index')
+            self._mirror_var(self.volume, '_volume')
+            self._mirror_var(self.speech_rate, '_speech_rate')
+            
+            # Max queued messages (same voice) spoken in one Speak call
+            self.tts_batch_size = 4
             
-            # Setup GUI
+            # Setup GUI (device/voice combos are filled once detection finishes)
             self.setup_gui()
             
+            # Detect audio devices and voices in the background so the window shows immediately
+            self.devices_detected = Event()
+            threading.Thread(target=self._detect_devices, daemon=True, name="DeviceDetect").start()
+            
             # Server attributes
             self.tcp_socket = None
             self.httpd = None
             
+            # Open TCP connections (listener thread only - closed when it exits)
+            self._tcp_clients = set()
+            
             # Start components
             self.start_log_file_writer()
             self.start_message_processor()
@@ -246,55 +468,61 @@ class TTSServerGUI:
     def acquire_lock(self) -> bool:
         """Acquire lock file to ensure single instance"""
         try:
-            # Try to create lock file exclusively
-            if os.path.exists(self.lock_file_path):
-                # Check if lock file is stale (process not running)
+            for attempt in range(2):
                 try:
-                    with open(self.lock_file_path, 'r') as f:
-                        pid = int(f.read().strip())
+                    # Create lock file exclusively - fails atomically if it already exists
+                    fd = os.open(self.lock_file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    if attempt:
+                        return False  # Re-created by another instance after we removed it
                     
-                    # Check if process is still running
-                    if self.is_process_running(pid):
+                    # Check if lock file is stale (process not running)
+                    try:
+                        with open(self.lock_file_path, 'r') as f:
+                            pid = int(f.read().strip())
+                    except (OSError, ValueError):
+                        pid = None
+                    
+                    if pid is None:
+                        # Empty or unreadable - the owner may have just created it and not
+                        # written its PID yet, so only a file that stays invalid is stale
+                        try:
+                            age = time.time() - os.path.getmtime(self.lock_file_path)
+                        except FileNotFoundError:
+                            continue  # Removed meanwhile - try to create it again
+                        if age < 5:
+                            return False  # Treat a fresh lock file as held
+                        print("Removing invalid lock file")
+                        os.remove(self.lock_file_path)
+                    elif self.is_process_running(pid):
                         return False  # Another instance is running
                     else:
                         # Stale lock file, remove it
                         print(f"Removing stale lock file (PID {pid} not running)")
                         os.remove(self.lock_file_path)
-                except:
-                    # Invalid lock file, remove it
-                    print("Removing invalid lock file")
-                    os.remove(self.lock_file_path)
-            
-            # Create lock file with current PID
-            with open(self.lock_file_path, 'w') as f:
-                f.write(str(os.getpid()))
-            
-            print(f"Lock acquired (PID: {os.getpid()})")
-            return True
+                    continue
+                
+                # Write current PID into the new lock file
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                
+                print(f"Lock acquired (PID: {os.getpid()})")
+                return True
+            return False
         except Exception as e:
             print(f"Error acquiring lock: {e}")
             return False
 
     def is_process_running(self, pid: int) -> bool:
         """Check if a process with given PID is running"""
+        global _pid_exists
+        if _pid_exists is None:
+            _pid_exists = _resolve_pid_exists()  # Import psutil/ctypes only once
         try:
-            # Try psutil first (more reliable)
-            import psutil
-            return psutil.pid_exists(pid)
-        except ImportError:
-            # psutil not available, use Windows-specific check
-            try:
-                import ctypes
-                kernel32 = ctypes.windll.kernel32
-                PROCESS_QUERY_INFORMATION = 0x0400
-                handle = kernel32.OpenProcess(PROCESS_QUERY_INFORMATION, False, pid)
-                if handle:
-                    kernel32.CloseHandle(handle)
-                    return True
-                return False
-            except:
-                # Fallback: assume process is running if we can't check
-                return True
+            return _pid_exists(pid)
+        except:
+            # Fallback: assume process is running if we can't check
+            return True
 
     def release_lock(self):
         """Release lock file"""
@@ -305,6 +533,17 @@ class TTSServerGUI:
         except Exception as e:
             print(f"Error releasing lock: {e}")
 
+    def _mirror_var(self, var, attr: str):
+        """Keep self.<attr> equal to a Tk variable's value, updated by a write trace"""
+        def update(*args):
+            try:
+                setattr(self, attr, var.get())
+            except (tk.TclError, ValueError):
+                pass  # Transient invalid value - keep the last good one
+        
+        setattr(self, attr, var.get())
+        var.trace_add('write', update)
+
     def detect_voices(self):
         """Detect all available TTS voices and classify by gender"""
         try:
@@ -312,7 +551,7 @@ class TTSServerGUI:
             pythoncom.CoInitialize()
             
             try:
-                engine = win32com.client.Dispatch("SAPI.SpVoice")
+                engine = _create_sapi_voice()
                 voices = engine.GetVoices()
                 
                 self.voices = []
@@ -320,11 +559,6 @@ class TTSServerGUI:
                 self.female_voices = []
                 zira_index = None
                 
-                # Male voice keywords
-                male_keywords = ["david", "mark", "james", "paul", "male", "man"]
-                # Female voice keywords  
-                female_keywords = ["zira", "hazel", "susan", "female", "woman", "huihui", "hanhan"]
-                
                 for i in range(voices.Count):
                     try:  # Wrap each voice query in try-except
                         voice = voices.Item(i)
@@ -333,10 +567,10 @@ class TTSServerGUI:
                         
                         # Classify gender based on name
                         gender = "unknown"
-                        if any(kw in name_lower for kw in male_keywords):
+                        if _MALE_VOICE_RE.search(name_lower):
                             gender = "male"
                             self.male_voices.append(i)
-                        elif any(kw in name_lower for kw in female_keywords):
+                        elif _FEMALE_VOICE_RE.search(name_lower):
                             gender = "female"
                             self.female_voices.append(i)
                         
@@ -352,10 +586,10 @@ class TTSServerGUI:
                 
                 # Set default voice (prefer Zira/female, then first available)
                 if zira_index is not None:
-                    self.selected_voice_index.set(zira_index)
+                    self._default_voice_index = zira_index
                     print(f"Default voice: Zira (index {zira_index})")
                 elif self.voices:
-                    self.selected_voice_index.set(0)
+                    self._default_voice_index = 0
                     print(f"Default voice: {self.voices[0][1]}")
                 
                 print(f"Male voices: {len(self.male_voices)}")
@@ -371,16 +605,6 @@ class TTSServerGUI:
             print(f"Error in detect_voices: {e}")
             self.voices = [(0, "Default Voice", "unknown")]
         
-    def get_voice_by_gender(self, requested_gender: str) -> int:
-        """Get voice index matching requested gender, fallback to default"""
-        if requested_gender == "male" and self.male_voices:
-            return self.male_voices[0]  # First male voice
-        elif requested_gender == "female" and self.female_voices:
-            return self.female_voices[0]  # First female voice
-        else:
-            # Return server default
-            return self.selected_voice_index.get()
-
     def detect_audio_devices(self):
         """Detect and prioritize audio output devices - FORCE REALTEK SPEAKER"""
         try:
@@ -388,7 +612,7 @@ class TTSServerGUI:
             pythoncom.CoInitialize()
             
             try:
-                engine = win32com.client.Dispatch("SAPI.SpVoice")
+                engine = _create_sapi_voice()
                 outputs = engine.GetAudioOutputs()
                 
                 all_devices = []
@@ -413,8 +637,8 @@ class TTSServerGUI:
                         continue
                     
                     # PRIORITY 2: Other computer speakers
-                    is_monitor = any(kw in desc_lower for kw in ["monitor", "display", "dell", "lg", "samsung", "hdmi", "asus", "acer", "hp"])
-                    is_computer_speaker = any(kw in desc_lower for kw in ["speakers", "internal", "built-in", "conexant", "idt", "laptop"])
+                    is_monitor = _MONITOR_DEVICE_RE.search(desc_lower) is not None
+                    is_computer_speaker = _COMPUTER_SPEAKER_RE.search(desc_lower) is not None
                     has_speaker = "speaker" in desc_lower
                     
                     if is_computer_speaker and not is_monitor and computer_speaker is None:
@@ -446,7 +670,6 @@ class TTSServerGUI:
                     self.audio_devices[0] = (self.audio_devices[0][0], self.audio_devices[0][1], "recommended")
                 
                 if self.audio_devices:
-                    self.selected_audio_index.set(self.audio_devices[0][0])
                     print(f"Selected default audio: [{self.audio_devices[0][0]}] {self.audio_devices[0][1]}")
                         
             except Exception as e:
@@ -461,20 +684,73 @@ class TTSServerGUI:
             self.audio_devices = [(0, "Default Audio Device", "recommended")]
             self.computer_speaker_index = 0
 
+    def _detect_devices(self):
+        """Enumerate audio devices and voices (background thread), then fill the GUI"""
+        self.detect_audio_devices()
+        self.detect_voices()
+        try:
+            self.root.after(0, self._populate_combos)
+        except Exception as e:
+            # The GUI thread can't be reached - start TTS on the detected defaults anyway
+            # (the combos stay empty) instead of leaving the processor waiting forever
+            print(f"Could not show detected devices: {e}")
+            self.log_system_async(f"Device list unavailable, using defaults: {e}")
+            if self.audio_devices:
+                self._audio_index = self.audio_devices[0][0]
+            self._voice_index = self._default_voice_index
+            self.devices_detected.set()
+
+    def _populate_combos(self):
+        """Apply detection results to the device/voice combos and defaults (GUI thread)"""
+        if self.audio_devices:
+            device_names = []
+            for idx, desc, category in self.audio_devices:
+                if category == "recommended":
+                    device_names.append(f"✓ {desc} [Recommended - Low Latency]")
+                elif category == "alternative":
+                    device_names.append(f"  {desc} [Alternative Speaker]")
+                else:
+                    device_names.append(f"  {desc}")
+            
+            self.audio_combo['values'] = device_names
+            self.audio_combo.current(0)
+            self.selected_audio_index.set(self.audio_devices[0][0])
+        
+        if self.voices:
+            voice_names = [f"{name} ({gender})" for idx, name, gender in self.voices]
+            self.voice_combo['values'] = voice_names
+            
+            selected_idx = self._default_voice_index
+            self.selected_voice_index.set(selected_idx)
+            if selected_idx < len(voice_names):
+                self.voice_combo.current(selected_idx)
+        
+        # The TTS processor waits for this before creating its engine
+        self.devices_detected.set()
+
     def is_computer_speaker(self, index: int) -> bool:
         """Check if the given index is the computer speaker"""
         return index == self.computer_speaker_index
 
+    def print_traceback_limited(self, tag: str):
+        """Print the current exception's traceback at most once per second per call site,
+        so an input that keeps failing does not spend the CPU formatting tracebacks"""
+        now = time.monotonic()
+        last = self._last_traceback_at.get(tag)
+        if last is None or now - last > 1.0:
+            self._last_traceback_at[tag] = now
+            traceback.print_exc()
+
     def get_next_message_id(self) -> int:
         with self.stats_lock:
             self.message_counter += 1
             return self.message_counter
 
     def clean_text(self, text: str) -> str:
-        allowed_chars = set(string.printable)
-        allowed_chars -= set("\x0b\x0c")
-        cleaned = "".join(c for c in text if c in allowed_chars)
-        return cleaned.strip()
+        # Drop non-ASCII first (only if present), then disallowed ASCII via the precomputed table
+        if not text.isascii():
+            text = text.encode('ascii', 'ignore').decode('ascii')
+        return text.translate(_CLEAN_TEXT_TABLE).strip()
 
     def setup_gui(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -499,19 +775,6 @@ class TTSServerGUI:
         self.audio_combo = ttk.Combobox(audio_frame, state="readonly", width=60)
         self.audio_combo.grid(row=0, column=1, sticky=(tk.W, tk.E))
         
-        if self.audio_devices:
-            device_names = []
-            for idx, desc, category in self.audio_devices:
-                if category == "recommended":
-                    device_names.append(f"✓ {desc} [Recommended - Low Latency]")
-                elif category == "alternative":
-                    device_names.append(f"  {desc} [Alternative Speaker]")
-                else:
-                    device_names.append(f"  {desc}")
-            
-            self.audio_combo['values'] = device_names
-            self.audio_combo.current(0)
-        
         # Auto-apply on change
         self.audio_combo.bind('<<ComboboxSelected>>', lambda e: self.on_audio_device_changed())
         
@@ -532,14 +795,6 @@ class TTSServerGUI:
         self.voice_combo = ttk.Combobox(voice_frame, state="readonly", width=60)
         self.voice_combo.grid(row=0, column=1, sticky=(tk.W, tk.E))
         
-        if self.voices:
-            voice_names = [f"{name} ({gender})" for idx, name, gender in self.voices]
-            self.voice_combo['values'] = voice_names
-            
-            selected_idx = self.selected_voice_index.get()
-            if selected_idx < len(voice_names):
-                self.voice_combo.current(selected_idx)
-        
         # Auto-apply on change
         self.voice_combo.bind('<<ComboboxSelected>>', lambda e: self.on_voice_changed())
         
@@ -652,17 +907,12 @@ class TTSServerGUI:
 
     def on_logging_toggled(self):
         """Handle logging checkbox toggle"""
-        if self.enable_file_logging.get():
-            self.log_system_async("File logging enabled")
+        self._file_logging = self.enable_file_logging.get()
+        if self._file_logging:
             # Add startup marker to log files
-            startup_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            startup_marker = f"\n{'='*80}\nLogging enabled: {startup_time}\n{'='*80}\n"
-            for log_file in [self.system_log_file, self.message_log_file]:
-                try:
-                    with open(log_file, 'a', encoding='utf-8') as f:
-                        f.write(startup_marker)
-                except:
-                    pass
+            startup_time = _format_second(int(time.time()))[1]
+            self._queue_log_marker(f"\n{'='*80}\nLogging enabled: {startup_time}\n{'='*80}")
+            self.log_system_async("File logging enabled")
         else:
             self.log_system_async("File logging disabled")
 
@@ -675,14 +925,14 @@ class TTSServerGUI:
         """Apply volume change when slider released"""
         volume_value = self.volume.get()
         self.log_system_async(f"Volume changed to {volume_value}%")
-        self.restart_tts_event.set()
+        self.request_tts_restart()
 
     def on_speed_changed(self):
         """Apply speed change (auto-applied on radio button click)"""
         speed_value = self.speech_rate.get()
         speed_labels = {0: "Normal", 1: "Faster", 2: "Fast", 3: "Very Fast"}
         self.log_system_async(f"Speech rate: {speed_labels.get(speed_value, speed_value)}")
-        self.restart_tts_event.set()
+        self.request_tts_restart()
 
     def on_voice_changed(self):
         """Handle voice selection change (auto-applied)"""
@@ -691,7 +941,7 @@ class TTSServerGUI:
             actual_index, voice_name, gender = self.voices[selected_pos]
             self.selected_voice_index.set(actual_index)
             self.log_system_async(f"Default voice: {voice_name} ({gender})")
-            self.restart_tts_event.set()
+            self.request_tts_restart()
 
     def on_audio_device_changed(self):
         """Handle audio device selection change (auto-applied)"""
@@ -703,7 +953,7 @@ class TTSServerGUI:
             if not self.is_computer_speaker(actual_index):
                 # Check if it's Bluetooth or USB (high latency devices)
                 desc_lower = device_name.lower()
-                is_high_latency = any(kw in desc_lower for kw in ["bluetooth", "usb", "wireless", "headphone", "headset"])
+                is_high_latency = _HIGH_LATENCY_DEVICE_RE.search(desc_lower) is not None
                 
                 if is_high_latency:
                     response = messagebox.showwarning(
@@ -736,17 +986,25 @@ class TTSServerGUI:
             
             self.selected_audio_index.set(actual_index)
             self.log_system_async(f"Audio device: {device_name}")
-            self.restart_tts_event.set()
+            self.request_tts_restart()
+
+    def request_tts_restart(self):
+        """Ask the TTS processor to re-create its engine with the current settings"""
+        self.restart_tts_event.set()
+        self.message_queue.interrupt()
 
     def update_stats_display(self):
         try:
             queue_size = self.message_queue.qsize()
-            self.queue_label.config(text=f"Queue: {queue_size}")
             
             with self.stats_lock:
                 processed = self.processed_counter
             
-            self.processed_label.config(text=f"Processed: {processed}")
+            # Only touch the labels (and trigger a redraw) when something changed
+            if (queue_size, processed) != self._shown_stats:
+                self._shown_stats = (queue_size, processed)
+                self.queue_label.config(text=f"Queue: {queue_size}")
+                self.processed_label.config(text=f"Processed: {processed}")
         except:
             pass
         
@@ -755,95 +1013,134 @@ class TTSServerGUI:
         except:
             pass
 
-    def log_message_async(self, message: str, timestamp: datetime = None):
-        """Log a TTS message"""
-        now = timestamp if timestamp else datetime.now()
-        screen_time = now.strftime("%H:%M:%S.%f")[:-3]
-        file_timestamp = now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    def log_message_async(self, message: str, timestamp: float = None):
+        """Log a TTS message (timestamp is epoch seconds, e.g. from time.time())"""
+        screen_time, file_timestamp = _format_log_timestamps(timestamp or time.time())
         
         screen_entry = f"[{screen_time}] {message}"
-        file_entry = f"[{file_timestamp}] {message}"
+        file_entry = f"[{file_timestamp}] {message}".encode('utf-8')
         
         # Add to buffer
-        with self.log_buffer_lock:
-            self.log_buffer.append(('message', screen_entry, file_entry, self.message_log_file))
+        self.log_buffer.append(('message', screen_entry, file_entry, self.message_log_file))
         
-        # Trigger display update
-        self._trigger_log_display()
+        # Trigger display update (skip the call if a drain is already pending)
+        if not self._log_display_scheduled:
+            self._trigger_log_display()
 
     def log_system_async(self, message: str):
         """Log a system event"""
-        now = datetime.now()
-        screen_time = now.strftime("%H:%M:%S.%f")[:-3]
-        file_timestamp = now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        screen_time, file_timestamp = _format_log_timestamps(time.time())
         
         screen_entry = f"[{screen_time}] {message}"
-        file_entry = f"[{file_timestamp}] {message}"
+        file_entry = f"[{file_timestamp}] {message}".encode('utf-8')
         
         # Add to buffer
-        with self.log_buffer_lock:
-            self.log_buffer.append(('system', screen_entry, file_entry, self.system_log_file))
+        self.log_buffer.append(('system', screen_entry, file_entry, self.system_log_file))
         
-        # Trigger display update
-        self._trigger_log_display()
+        # Trigger display update (skip the call if a drain is already pending)
+        if not self._log_display_scheduled:
+            self._trigger_log_display()
 
     def _trigger_log_display(self):
-        """Trigger log display"""
-        self._display_pending_logs()
-
-    def _display_pending_logs(self):
-        """Display all pending logs on GUI thread"""
-        # Get all pending entries
-        with self.log_buffer_lock:
-            if not self.log_buffer:
-                return
-            entries = self.log_buffer[:]
-            self.log_buffer.clear()
-        
-        # Schedule GUI update
-        def update_gui():
-            # Insert text
-            screen_text = "\n".join([e[1] for e in entries]) + "\n"
-            self.log_text.insert(tk.END, screen_text)
-            
-            # Limit to 60 lines
-            all_content = self.log_text.get('1.0', 'end-1c')
-            lines = all_content.split('\n')
-            
-            if len(lines) > 60:
-                self.log_text.delete('1.0', 'end')
-                self.log_text.insert('1.0', '\n'.join(lines[-60:]))
-            
-            self.log_text.see(tk.END)
+        """Schedule a GUI-thread drain of the log buffer (normally one pending at a time).
+        The drain runs on a 50 ms tick so a burst of entries costs one widget update."""
+        if self._log_display_scheduled:
+            return  # Already scheduled - this entry will be picked up by it
+        self._log_display_scheduled = True
         
-        # Execute on main thread
         try:
-            self.root.after(0, update_gui)
+            self.root.after(50, self._display_pending_logs)
         except:
-            pass
+            self._log_display_scheduled = False
+
+    def _display_pending_logs(self):
+        """Display all pending logs (runs on the GUI thread)"""
+        # Clear the flag before draining so later appends schedule a new drain
+        self._log_display_scheduled = False
+        
+        # Get the entries pending right now; anything appended meanwhile
+        # is picked up by the drain it schedules
+        popleft = self.log_buffer.popleft
+        entries = [popleft() for _ in range(len(self.log_buffer))]
+        if not entries:
+            return
+        
+        # Insert text - only the entries that can still be visible after trimming
+        shown = entries[-_LOG_DISPLAY_LINES:] if len(entries) > _LOG_DISPLAY_LINES else entries
+        screen_text = "\n".join([e[1] for e in shown]) + "\n"
+        self.log_text.insert(tk.END, screen_text)
+        
+        # Limit to 60 lines - trim the oldest once per batch instead of rewriting
+        lines = int(self.log_text.index('end-1c').split('.')[0])
+        if lines > _LOG_DISPLAY_LINES:
+            self.log_text.delete('1.0', f'{lines - _LOG_DISPLAY_LINES}.0')
+        
+        self.log_text.see(tk.END)
         
         # Queue for file writer
-        if self.enable_file_logging.get():
-            self.log_file_queue.put(entries)
+        if self._file_logging:
+            try:
+                self.log_file_queue.put_nowait(entries)
+            except queue.Full:
+                pass
+
+    def _queue_log_marker(self, marker: str):
+        """Queue a marker line for both log files (written in order by the log writer)"""
+        try:
+            self.log_file_queue.put_nowait([
+                ('marker', None, marker.encode('utf-8'), log_file)
+                for log_file in (self.system_log_file, self.message_log_file)
+            ])
+        except queue.Full:
+            pass
 
     def start_log_file_writer(self):
-        """Single dedicated thread for writing log files"""
+        """Single dedicated thread for writing log files.
+        
+        Log files are opened once as raw file descriptors and kept open by this
+        thread. Entries accumulate in a per-file bytearray which is written with
+        one os.write() once 64 entries are pending or 0.2 s after the last write
+        (or as soon as a buffer grows past 64 KB).
+        """
+        self._log_handles = {}
+        
         def write_logs():
+            last_flush = time.monotonic()
+            pending = 0  # Entries buffered since the last flush
             while not self.shutdown_event.is_set():
                 try:
-                    entries = self.log_file_queue.get(timeout=1.0)
-                    if entries:
-                        self._write_logs_to_files(entries)
+                    entries = self.log_file_queue.get(timeout=0.2)
+                    # Take everything else already queued and write it in one pass
+                    while True:
+                        try:
+                            entries.extend(self.log_file_queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    self._write_logs_to_files(entries)
+                    pending += len(entries)
                 except queue.Empty:
-                    continue
+                    pass
+                
+                if pending and (pending >= 64 or time.monotonic() - last_flush >= 0.2):
+                    self._flush_log_files()
+                    pending = 0
+                    last_flush = time.monotonic()
+            
+            # Drain whatever was queued before shutdown, then close the files
+            while True:
+                try:
+                    self._write_logs_to_files(self.log_file_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._close_log_files()
         
         self.log_writer_thread = threading.Thread(target=write_logs, daemon=True, name="LogWriter")
         self.log_writer_thread.start()
 
     def _write_logs_to_files(self, entries):
-        """Write logs to files asynchronously with buffering"""
+        """Write logs to files asynchronously with buffering (file entries are UTF-8 bytes)"""
         # Only write if file logging is enabled
-        if not self.enable_file_logging.get():
+        if not self._file_logging:
             return
         
         file_writes = {}
@@ -854,11 +1151,41 @@ class TTSServerGUI:
         
         for log_file, lines in file_writes.items():
             try:
-                # Use larger buffer to reduce disk I/O
-                with open(log_file, 'a', encoding='utf-8', buffering=8192) as f:
-                    f.write("\n".join(lines) + "\n")
+                handle = self._log_handles.get(log_file)
+                if handle is None:
+                    # Text-mode fd (no O_BINARY) keeps CRLF line endings on Windows
+                    fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    handle = self._log_handles[log_file] = (fd, bytearray())
+                fd, buf = handle
+                buf += b"\n".join(lines)
+                buf += b"\n"
+                if len(buf) >= 65536:
+                    self._write_log_buffer(fd, buf)
+            except:
+                pass
+
+    def _write_log_buffer(self, fd: int, buf: bytearray):
+        """Write out and empty one log buffer (log writer thread only)"""
+        while buf:
+            del buf[:os.write(fd, buf)]
+
+    def _flush_log_files(self):
+        """Flush buffered log data to disk (log writer thread only)"""
+        for fd, buf in self._log_handles.values():
+            try:
+                self._write_log_buffer(fd, buf)
+            except:
+                pass
+
+    def _close_log_files(self):
+        """Close all open log files (log writer thread only)"""
+        self._flush_log_files()
+        for fd, buf in self._log_handles.values():
+            try:
+                os.close(fd)
             except:
                 pass
+        self._log_handles.clear()
 
     def update_status(self, server_type: str, status: str):
         def do_update():
@@ -878,6 +1205,13 @@ class TTSServerGUI:
             try:
                 import pythoncom
                 
+                pending = []  # Messages taken from the queue but not spoken yet
+                
+                # Devices and voices are detected in the background; wait for the defaults
+                while not self.devices_detected.wait(0.5):
+                    if self.shutdown_event.is_set():
+                        return
+                
                 while not self.shutdown_event.is_set():
                     pythoncom.CoInitialize()
                     self.restart_tts_event.clear()
@@ -885,10 +1219,10 @@ class TTSServerGUI:
                     self.log_system_async("TTS started (async mode)")
                     
                     try:
-                        engine = win32com.client.Dispatch("SAPI.SpVoice")
+                        engine = _create_sapi_voice()
                         
                         # Set audio output
-                        selected_audio_index = self.selected_audio_index.get()
+                        selected_audio_index = self._audio_index
                         outputs = engine.GetAudioOutputs()
                         
                         if selected_audio_index < outputs.Count:
@@ -896,85 +1230,114 @@ class TTSServerGUI:
                             device_name = outputs.Item(selected_audio_index).GetDescription()
                             self.log_system_async(f"Output: {device_name}")
                         
-                        # Get all voices for switching
+                        # Get all voices for switching - resolve the tokens once, and map
+                        # client gender requests straight to a voice index
                         all_voices = engine.GetVoices()
+                        voice_tokens = [all_voices.Item(i) for i in range(all_voices.Count)]
+                        voice_by_gender = {}
+                        if self.male_voices:
+                            voice_by_gender["male"] = self.male_voices[0]  # First male voice
+                        if self.female_voices:
+                            voice_by_gender["female"] = self.female_voices[0]  # First female voice
                         
                         # Set default voice
-                        selected_voice_index = self.selected_voice_index.get()
+                        selected_voice_index = self._voice_index
+                        current_voice_idx = None  # Voice/volume/rate last set on the engine
                         
-                        if selected_voice_index < all_voices.Count:
-                            engine.Voice = all_voices.Item(selected_voice_index)
-                            voice_name = all_voices.Item(selected_voice_index).GetDescription()
+                        if selected_voice_index < len(voice_tokens):
+                            engine.Voice = voice_tokens[selected_voice_index]
+                            current_voice_idx = selected_voice_index
+                            voice_name = voice_tokens[selected_voice_index].GetDescription()
                             self.log_system_async(f"Default voice: {voice_name}")
                         
                         # Set volume and rate
-                        engine.Volume = self.volume.get()
-                        engine.Rate = self.speech_rate.get()
+                        current_volume = self._volume
+                        current_rate = self._speech_rate
+                        engine.Volume = current_volume
+                        engine.Rate = current_rate
                         
-                        self.log_system_async(f"Volume: {self.volume.get()}%")
+                        self.log_system_async(f"Volume: {self._volume}%")
                         
-                        rate_value = self.speech_rate.get()
+                        rate_value = self._speech_rate
                         rate_labels = {0: "Normal", 1: "Faster", 2: "Fast", 3: "Very Fast"}
                         self.log_system_async(f"Speed: {rate_labels.get(rate_value, rate_value)}")
                         
                         self.log_system_async("Ready")
+                        self.tts_ready_event.set()
                         
                     except Exception as e:
                         self.log_system_async(f"Init error: {e}")
                         traceback.print_exc()
                         pythoncom.CoUninitialize()
-                        time.sleep(1)
+                        # Retry pause that ends at once on shutdown (the loop re-checks it)
+                        self.shutdown_event.wait(1.0)
                         continue
                     
                     # Main processing loop
                     while not self.shutdown_event.is_set() and not self.restart_tts_event.is_set():
                         try:
-                            # OPTIMIZED: 1ms timeout
-                            message = self.message_queue.get_wait(timeout=0.001)
+                            # Sleep on the queue (unless messages are left over); put() or
+                            # interrupt() wakes us instantly. Already-queued messages come along.
+                            if len(pending) < self.tts_batch_size:
+                                pending += self.message_queue.get_batch(
+                                    self.tts_batch_size - len(pending),
+                                    timeout=0 if pending else 0.5
+                                )
                             
-                            if message:
+                            if pending:
                                 # Unpack message with receive timestamp
-                                text, source, voice_gender, receive_timestamp = message
-                                msg_id = self.get_next_message_id()
+                                text, source, voice_gender, receive_timestamp = pending[0]
+                                
+                                # Speak the leading run of same-voice messages in one Speak call;
+                                # the rest waits for the next round
+                                n = 1
+                                while n < len(pending) and pending[n][2] == voice_gender:
+                                    n += 1
+                                batch, pending = pending[:n], pending[n:]
                                 
                                 # Log immediately when message is received
-                                self.log_message_async(f"[#{msg_id}] {text}", receive_timestamp)
+                                for item_text, _, _, item_timestamp in batch:
+                                    msg_id = self.get_next_message_id()
+                                    self.log_message_async(f"[#{msg_id}] {item_text}", item_timestamp)
                                 
-                                # Select voice based on client preference
-                                if voice_gender in ["male", "female"]:
-                                    requested_voice_idx = self.get_voice_by_gender(voice_gender)
-                                    
-                                    if requested_voice_idx < all_voices.Count:
-                                        engine.Voice = all_voices.Item(requested_voice_idx)
-                                else:
-                                    # Use server default voice
-                                    default_voice_idx = self.selected_voice_index.get()
-                                    if default_voice_idx < all_voices.Count:
-                                        engine.Voice = all_voices.Item(default_voice_idx)
+                                # Select voice based on client preference, else the server default
+                                # (COM property writes only when the value actually changes)
+                                requested_voice_idx = voice_by_gender.get(voice_gender, self._voice_index)
+                                if requested_voice_idx != current_voice_idx and requested_voice_idx < len(voice_tokens):
+                                    engine.Voice = voice_tokens[requested_voice_idx]
+                                    current_voice_idx = requested_voice_idx
                                 
                                 # Update volume and rate dynamically
-                                engine.Volume = self.volume.get()
-                                engine.Rate = self.speech_rate.get()
+                                if self._volume != current_volume:
+                                    current_volume = self._volume
+                                    engine.Volume = current_volume
+                                if self._speech_rate != current_rate:
+                                    current_rate = self._speech_rate
+                                    engine.Rate = current_rate
                                 
                                 # ASYNC MODE - Returns immediately
+                                if len(batch) > 1:
+                                    text = ". ".join(item[0] for item in batch)
                                 engine.Speak(text, 1)  # 1 = async
                                 
-                                # Wait ONLY until speech completes
-                                while engine.Status.RunningState == 2:  # 2 = speaking
-                                    time.sleep(0.001)  # 1ms polling
+                                # Wait ONLY until speech completes - blocks inside SAPI, waking
+                                # every 100 ms just to notice shutdown
+                                while not engine.WaitUntilDone(100):
+                                    if self.shutdown_event.is_set():
+                                        break
                                 
                                 with self.stats_lock:
-                                    self.processed_counter += 1
+                                    self.processed_counter += len(batch)
                         
                         except Exception as e:
                             self.log_system_async(f"Error: {e}")
-                            traceback.print_exc()
+                            self.print_traceback_limited("tts")
                     
                     pythoncom.CoUninitialize()
                     
                     if self.restart_tts_event.is_set():
                         self.log_system_async("Restarting...")
-                        time.sleep(0.3)
+                        self.shutdown_event.wait(0.3)
                 
                 self.log_system_async("TTS stopped")
                 
@@ -990,63 +1353,129 @@ class TTSServerGUI:
         self.processor_thread.start()
 
     def is_ip_allowed(self, ip: str) -> bool:
+        allowed = self._ip_allow_cache.get(ip)
+        if allowed is not None:
+            return allowed
+        
         try:
-            ip_addr = ipaddress.ip_address(ip)
-            return any(ip_addr in net for net in self.allowed_networks)
-        except ValueError:
-            return False
+            # Strict dotted-quad IPv4 parse; IPv6 addresses are rejected here
+            ip_int = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+            allowed = any((ip_int & mask) == net for net, mask in self.allowed_networks)
+        except OSError:
+            allowed = False
+        
+        if len(self._ip_allow_cache) >= 1024:
+            self._ip_allow_cache.clear()  # Keep the cache bounded
+        self._ip_allow_cache[ip] = allowed
+        return allowed
 
-    def handle_tcp_client(self, client_socket, addr):
-        client_ip = addr[0]
-        
-        if not self.is_ip_allowed(client_ip):
-            self.log_system_async(f"Rejected {client_ip}")
-            client_socket.close()
-            return
-        
+    def _read_tcp_client(self, sel, client: TCPClient):
+        """Read what one TCP client sent and queue complete messages (listener thread)"""
         try:
-            data = b""
-            while True:
-                chunk = client_socket.recv(4096)
-                if not chunk:
-                    break
-                data += chunk
-                
-                try:
-                    # TIMESTAMP WHEN MESSAGE ARRIVES
-                    receive_timestamp = datetime.now()
-                    
-                    message = data.decode('utf-8')
-                    
-                    # Try to parse as JSON first
-                    text = None
-                    voice_gender = "default"
-                    
-                    try:
-                        message_data = json.loads(message)
-                        if isinstance(message_data, dict):
-                            text = message_data.get("text", "")
-                            voice_gender = message_data.get("voice_gender", "default")
-                        else:
-                            text = message
-                    except (json.JSONDecodeError, TypeError, ValueError):
-                        text = message
-                    
-                    if text:
-                        cleaned = self.clean_text(text)
-                        
-                        if cleaned:
-                            if not self.message_queue.put((cleaned, f"TCP:{client_ip}", voice_gender, receive_timestamp)):
-                                self.log_system_async(f"Queue full, message dropped from {client_ip}")
+            chunk = client.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return  # Spurious wake-up, nothing to read yet
+        except OSError:
+            chunk = b""  # Connection reset - treat like a close
         
-                    data = b""
-                except UnicodeDecodeError:
-                    continue
+        data = client.data
+        try:
+            if not chunk:
+                self._close_tcp_client(sel, client)
+                # Connection closed - anything left over is a final unterminated message
+                if data:
+                    self._handle_tcp_message(data, client.ip, client.received_at)
+                return
+            
+            # TIMESTAMP WHEN MESSAGE ARRIVES
+            receive_timestamp = time.time()
+            
+            scan_from = len(data)  # Bytes before this were already searched for a newline
+            if not scan_from:
+                client.received_at = receive_timestamp
+            data.extend(chunk)
+            
+            # Cut off every complete newline-terminated message in one go;
+            # a partial message stays in the buffer for the next recv
+            end = data.rfind(b"\n", scan_from)
+            if end != -1:
+                client.framed = True
+                messages = data[:end].split(b"\n")
+                del data[:end + 1]
+                client.received_at = receive_timestamp  # Any tail left started in this recv
+                for message in messages:
+                    self._handle_tcp_message(message, client.ip, receive_timestamp)
+            
+            if len(data) > _TCP_MAX_BUFFER:
+                self.log_system_async(f"TCP message too large from {client.ip}, closing")
+                self._close_tcp_client(sel, client)
+                del data[:]
+                return
+            
+            # A partial message always waits for more bytes; if the client never sent a
+            # newline, the listener loop treats it as a legacy message once the client is idle
+            if data:
+                client.last_recv = time.monotonic()
         except Exception as e:
             self.log_system_async(f"TCP error: {e}")
-            traceback.print_exc()
-        finally:
-            client_socket.close()
+            self.print_traceback_limited("tcp")
+            self._close_tcp_client(sel, client)
+
+    def _flush_legacy_tcp_clients(self, sel) -> bool:
+        """Queue the buffered bytes of idle clients that never sent a newline as one
+        message each (listener thread). Returns True while such bytes are still waiting."""
+        waiting = False
+        now = time.monotonic()
+        for client in list(self._tcp_clients):  # A failing client is closed (removed) below
+            if client.data and not client.framed:
+                if now - client.last_recv >= _TCP_LEGACY_IDLE:
+                    # Detach the bytes first so a message that fails to parse is not retried
+                    raw = bytes(client.data)
+                    del client.data[:]
+                    try:
+                        self._handle_tcp_message(raw, client.ip, client.received_at)
+                    except Exception as e:
+                        self.log_system_async(f"TCP error: {e}")
+                        self.print_traceback_limited("tcp")
+                        self._close_tcp_client(sel, client)
+                else:
+                    waiting = True
+        return waiting
+
+    def _close_tcp_client(self, sel, client: TCPClient):
+        if client in self._tcp_clients:
+            self._tcp_clients.discard(client)
+            sel.unregister(client.sock)
+            client.sock.close()
+
+    def _handle_tcp_message(self, raw: bytes, client_ip: str, receive_timestamp: float):
+        """Parse one TCP message (JSON or plain text) and queue it"""
+        # Filter disallowed bytes before anything else; what is left is plain ASCII
+        message = raw.translate(None, _CLEAN_BYTES_DELETE)
+        
+        # Messages that look like a JSON object are parsed straight from the bytes
+        cleaned = None
+        voice_gender = "default"
+        
+        if message.lstrip()[:1] == b"{":
+            try:
+                message_data = _json_loads(message)
+                # JSON escapes may still produce disallowed characters; a text that
+                # is not a string (null, number, list) counts as an empty message
+                text = message_data.get("text")
+                cleaned = self.clean_text(text) if isinstance(text, str) else ""
+                voice_gender = message_data.get("voice_gender", "default")
+                if not isinstance(voice_gender, str):
+                    voice_gender = "default"  # Must stay hashable for the voice lookup
+            except ValueError:
+                pass
+        
+        if cleaned is None:
+            cleaned = message.decode('ascii').strip()
+        
+        if cleaned:
+            if not self.message_queue.put((cleaned, f"TCP:{client_ip}", voice_gender, receive_timestamp)):
+                self.log_system_async(f"Queue full, message dropped from {client_ip}")
 
     def is_port_in_use(self, port: int) -> bool:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -1056,86 +1485,154 @@ class TTSServerGUI:
             except socket.error as e:
                 return e.errno == errno.EADDRINUSE
 
-    def start_tcp_server(self):
+    def start_tcp_server(self, sel):
+        """Open the TCP listener and register it with the shared selector"""
         if self.is_port_in_use(self.tcp_port):
             self.update_status("TCP", f"Port {self.tcp_port} in use")
             return
         
-        def run_tcp_server():
-            try:
-                self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                self.tcp_socket.bind(('0.0.0.0', self.tcp_port))
-                self.tcp_socket.listen(5)
-                self.update_status("TCP", "Ready")
-                
-                while not self.shutdown_event.is_set():
-                    readable, _, _ = select.select([self.tcp_socket], [], [], 1.0)
-                    
-                    if readable:
-                        client_socket, addr = self.tcp_socket.accept()
-                        
-                        client_thread = threading.Thread(
-                            target=self.handle_tcp_client,
-                            args=(client_socket, addr),
-                            daemon=True
-                        )
-                        client_thread.start()
-            
-            except Exception as e:
-                self.log_system_async(f"TCP error: {e}")
-            finally:
-                if self.tcp_socket:
-                    self.tcp_socket.close()
+        try:
+            self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):  # Not available on Windows
+                self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.tcp_socket.bind(('0.0.0.0', self.tcp_port))
+            self.tcp_socket.listen(5)
+            self.tcp_socket.setblocking(False)
+            sel.register(self.tcp_socket, selectors.EVENT_READ, functools.partial(self._accept_tcp_client, sel))
+            self.update_status("TCP", "Ready")
+        except Exception as e:
+            self.log_system_async(f"TCP error: {e}")
+            if self.tcp_socket:
+                self.tcp_socket.close()
+                self.tcp_socket = None
+
+    def _accept_tcp_client(self, sel):
+        try:
+            client_socket, addr = self.tcp_socket.accept()
+        except OSError:
+            return  # Client went away before we got to it
+        
+        client_ip = addr[0]
+        if not self.is_ip_allowed(client_ip):
+            self.log_system_async(f"Rejected {client_ip}")
+            client_socket.close()
+            return
+        
+        if len(self._tcp_clients) >= _TCP_MAX_CLIENTS:
+            self.log_system_async(f"Too many TCP clients, rejected {client_ip}")
+            client_socket.close()
+            return
         
-        self.tcp_thread = threading.Thread(target=run_tcp_server, daemon=True)
-        self.tcp_thread.start()
+        # Reads are driven by the same selector as the listeners
+        client_socket.setblocking(False)
+        client = TCPClient(client_socket, client_ip)
+        try:
+            sel.register(client_socket, selectors.EVENT_READ, functools.partial(self._read_tcp_client, sel, client))
+        except Exception:
+            client_socket.close()
+            raise
+        self._tcp_clients.add(client)
 
-    def start_http_server(self):
+    def start_http_server(self, sel):
+        """Open the HTTP listener and register it with the shared selector"""
         if self.is_port_in_use(self.http_port):
             self.update_status("HTTP", f"Port {self.http_port} in use")
             return
         
-        def run_http_server():
-            try:
-                self.httpd = HTTPServer(('', self.http_port), TTSRequestHandler)
-                self.httpd.message_queue = self.message_queue
-                self.httpd.gui = self
-                self.update_status("HTTP", "Ready")
-                self.httpd.serve_forever()
-            except Exception as e:
-                self.log_system_async(f"HTTP error: {e}")
-        
-        self.http_thread = threading.Thread(target=run_http_server, daemon=True)
-        self.http_thread.start()
+        try:
+            self.httpd = TTSHTTPServer(('', self.http_port), TTSRequestHandler)
+            self.httpd.message_queue = self.message_queue
+            self.httpd.gui = self
+            self.httpd.socket.setblocking(False)
+            sel.register(self.httpd, selectors.EVENT_READ, self.httpd._handle_request_noblock)
+            self.update_status("HTTP", "Ready")
+        except Exception as e:
+            self.log_system_async(f"HTTP error: {e}")
+
+    def wait_for_tts_ready(self) -> bool:
+        """Block until the TTS engine is live; False if shutting down first"""
+        while not self.tts_ready_event.wait(0.5):
+            if self.shutdown_event.is_set():
+                return False
+        return not self.shutdown_event.is_set()
 
     def start_servers(self):
-        self.start_tcp_server()
-        self.start_http_server()
+        """Serve both listeners and all TCP connections from one selector loop on a single thread"""
+        # on_close() writes to this pair to wake the loop
+        self._listener_wakeup_r, self._listener_wakeup_w = socket.socketpair()
+        
+        def run_listeners():
+            if not self.wait_for_tts_ready():
+                return
+            
+            sel = selectors.DefaultSelector()
+            sel.register(self._listener_wakeup_r, selectors.EVENT_READ, None)
+            self.start_tcp_server(sel)
+            self.start_http_server(sel)
+            
+            try:
+                legacy_waiting = False
+                while not self.shutdown_event.is_set():
+                    # Wake up for the legacy idle check only while such bytes are buffered
+                    try:
+                        events = sel.select(_TCP_LEGACY_IDLE if legacy_waiting else None)
+                    except Exception as e:
+                        # Keep serving; pause so a persistent error cannot spin the loop
+                        self.log_system_async(f"Listener error: {e}")
+                        self.print_traceback_limited("select")
+                        self.shutdown_event.wait(0.5)
+                        continue
+                    
+                    for key, _ in events:
+                        if key.data is None:
+                            break  # Woken up for shutdown
+                        # One failing callback must not take down the other connections
+                        try:
+                            key.data()
+                        except Exception as e:
+                            self.log_system_async(f"Listener error: {e}")
+                            self.print_traceback_limited("listener")
+                    
+                    try:
+                        legacy_waiting = self._flush_legacy_tcp_clients(sel)
+                    except Exception as e:
+                        legacy_waiting = False  # Don't keep waking up for a failing check
+                        self.log_system_async(f"Listener error: {e}")
+                        self.print_traceback_limited("listener")
+            finally:
+                for client in list(self._tcp_clients):
+                    self._close_tcp_client(sel, client)
+                sel.close()
+                if self.tcp_socket:
+                    self.tcp_socket.close()
+                if self.httpd:
+                    self.httpd.server_close()
+        
+        self.listener_thread = threading.Thread(target=run_listeners, daemon=True, name="Listeners")
+        self.listener_thread.start()
 
     def on_close(self):
         self.log_system_async("Shutting down...")
+        self._display_pending_logs()  # Hand pending entries to the file writer now
         
         # Add shutdown marker to log files if logging enabled
-        if self.enable_file_logging.get():
-            shutdown_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            shutdown_marker = f"Server stopped: {shutdown_time}\n{'='*80}\n"
-            for log_file in [self.system_log_file, self.message_log_file]:
-                try:
-                    with open(log_file, 'a', encoding='utf-8') as f:
-                        f.write(shutdown_marker)
-                except:
-                    pass
+        if self._file_logging:
+            shutdown_time = _format_second(int(time.time()))[1]
+            self._queue_log_marker(f"Server stopped: {shutdown_time}\n{'='*80}")
         
         self.shutdown_event.set()
+        self.message_queue.interrupt()
         
-        if hasattr(self, 'httpd') and self.httpd:
-            self.httpd.shutdown()
-            if hasattr(self, 'http_thread'):
-                self.http_thread.join(timeout=2)
-        
-        if hasattr(self, 'tcp_socket') and self.tcp_socket:
-            self.tcp_socket.close()
+        if hasattr(self, 'listener_thread'):
+            # Wake the listener loop; it closes the listening sockets and TCP clients on exit
+            try:
+                self._listener_wakeup_w.send(b"\0")
+            except OSError:
+                pass
+            self.listener_thread.join(timeout=2)
+            self._listener_wakeup_r.close()
+            self._listener_wakeup_w.close()
         
         if hasattr(self, 'processor_thread'):
             self.processor_thread.join(timeout=2)